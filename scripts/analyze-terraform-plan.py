@@ -6,31 +6,77 @@ Analyzes Terraform plan output and provides AI-powered insights using Azure Open
 
 import os
 import sys
+import re
 import json
+import hashlib
+import shutil
 import subprocess
+import tempfile
 import requests
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import groupby
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Any, List, Optional
 
-def get_terraform_plan_text() -> str:
-    """Generate human-readable Terraform plan output"""
-    try:
-        # Run terraform show to get human-readable plan
-        result = subprocess.run(
-            ['terraform', 'show', '-no-color', 'tfplan'],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        print(f"Error generating plan text: {e}")
-        print(f"stderr: {e.stderr}")
-        return ""
+# orjson parses the streamed chunks faster; fall back to the stdlib json module without it
+try:
+    from orjson import dumps as _json_dumps, loads as _json_loads
+except ImportError:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _json_loads = json.loads
 
-def analyze_plan_with_azure_openai(plan_text: str, api_key: str, endpoint: str, deployment_name: str, api_version: str = "2024-02-15-preview") -> Dict[str, Any]:
-    """Send Terraform plan to Azure OpenAI for analysis"""
-    
-    system_prompt = """You are a Terraform infrastructure expert and security analyst. 
+# Plans over one chunk are reviewed in parts, at most this many requests at a time
+_CHUNK_SIZE = 10000
+_MAX_PLAN_LENGTH = 8 * _CHUNK_SIZE
+
+# Upper bound on terraform show output read into memory (well above what compression leaves for analysis)
+_MAX_PLAN_READ_BYTES = 1 << 20
+_MAX_CONCURRENT_REQUESTS = 4
+
+# Shared HTTP session so retries and follow-up calls reuse the pooled TLS connection
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=_MAX_CONCURRENT_REQUESTS,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+        # Hand the last 429/5xx response back so its status and body get logged
+        raise_on_status=False
+    )
+))
+
+# Resolve environment settings once instead of rescanning them on every request
+# (the proxy is pinned in configure_session_proxy once the endpoint is known)
+_SESSION.trust_env = False
+_CA_BUNDLE = os.getenv('REQUESTS_CA_BUNDLE') or os.getenv('CURL_CA_BUNDLE')
+if _CA_BUNDLE:
+    _SESSION.verify = _CA_BUNDLE
+
+# Azure DevOps formatting wrapped around the analysis in the pipeline log
+_HEADER = "\n##[section]🤖 AI-Powered Terraform Plan Analysis\n\n"
+_FOOTER = "\n\n---\n💡 Analysis completed using Azure OpenAI Service\n⚠️  Please review recommendations carefully before deployment\n"
+
+# Keywords in the analysis that flag critical issues for the pipeline
+_CRITICAL_RE = re.compile(r"critical|severe|high risk|security vulnerability|exposed", re.IGNORECASE)
+_CRITICAL_WARNING = "##[warning]⚠️ Critical issues detected in analysis. Please review carefully!"
+
+# Output budgets sized to the character limits in the prompts (~4 characters per token plus headroom)
+_ANALYSIS_MAX_TOKENS = 950
+_CHUNK_MAX_TOKENS = 450
+_STOP_SEQUENCES = ['\n\n---', 'End of analysis']
+
+# Character limit of the saved analysis artifact
+_MAX_ARTIFACT_LENGTH = 4000
+
+# Prompts are kept byte-identical across runs so Azure OpenAI's automatic
+# prompt caching can serve the shared prefix instead of reprocessing it
+_SYSTEM_PROMPT = """You are a Terraform infrastructure expert and security analyst. 
 Analyze the provided Terraform plan and provide insights on:
 
 1. SECURITY ANALYSIS:
@@ -62,14 +108,104 @@ Analyze the provided Terraform plan and provide insights on:
 Format your response in clear sections with bullet points. Be concise but thorough.
 Focus on actionable insights that would help in a DevOps pipeline review. Keep response under 3500 characters for file output. Use plain text format only - no markdown formatting."""
 
-    user_prompt = f"""Please analyze this Terraform plan for Azure infrastructure deployment:
+_USER_PROMPT_PREAMBLE = """Please analyze this Terraform plan for Azure infrastructure deployment.
+Provide your analysis following the structure requested in the system prompt.
+
+"""
+
+# Prompts for large plans: each part is reviewed on its own, then the findings are merged
+_CHUNK_SYSTEM_PROMPT = """You are a Terraform infrastructure expert and security analyst.
+You are reviewing one part of a larger Terraform plan. List the security, cost, best practice
+and risk findings for the resources in this part as short bullet points, naming the affected
+resource in each one. Keep response under 1500 characters. Use plain text format only - no markdown formatting."""
 
-```
-{plan_text}
-```
+_REDUCE_PROMPT_PREAMBLE = """Please analyze this Terraform plan for Azure infrastructure deployment.
+The plan was too large for a single request, so each part of it has already been reviewed.
+Combine the findings for all parts below into one analysis following the structure requested in the system prompt.
 
-Provide your analysis following the structure requested in the system prompt."""
+"""
+
+# Low-signal parts of terraform show output dropped or shortened before prompting
+_HIDDEN_RE = re.compile(r"^# \(\d+ unchanged \w+ hidden\)$")
+_ALIGNMENT_RE = re.compile(r"^(\s*[-+~]?\s*\S+) {2,}=")
+_LONG_STRING_RE = re.compile(r'"([^"\n]{200,})"')
+
+# Start of a resource block ("  # azurerm_x.y will be created") where large plans are split
+_RESOURCE_BOUNDARY_RE = re.compile(r"^(?= *# (?!\().+? (?:will|must|has|is tainted)\b)", re.MULTILINE)
+
+# Directory holding previous analyses keyed by plan hash (restored between runs by the workflow)
+_CACHE_DIR = os.getenv('TF_ANALYSIS_CACHE_DIR', '.tf-analysis-cache')
+
+def get_terraform_plan_text() -> str:
+    """Generate human-readable Terraform plan output"""
+    try:
+        # Run terraform show into a temporary file and read back only what the analysis can use
+        with tempfile.TemporaryFile() as plan_file:
+            subprocess.run(
+                ['terraform', 'show', '-no-color', 'tfplan'],
+                stdout=plan_file,
+                stderr=subprocess.PIPE,
+                check=True
+            )
+            plan_file.seek(0)
+            return plan_file.read(_MAX_PLAN_READ_BYTES).decode('utf-8', 'replace')
+    except subprocess.CalledProcessError as e:
+        print(f"Error generating plan text: {e}")
+        print(f"stderr: {e.stderr.decode('utf-8', 'replace')}")
+        return ""
+
+def compress_plan_text(plan_text: str) -> str:
+    """Strip repetitive noise from the plan so more of it fits in the analysis prompt"""
+    lines = []
+    for line, group in groupby(plan_text.splitlines()):
+        stripped = line.strip()
+        if not stripped:
+            lines.append("")
+            continue
+        # Computed attributes and hidden-attribute markers carry no reviewable information
+        if stripped.endswith("= (known after apply)") or _HIDDEN_RE.match(stripped):
+            continue
+        line = _ALIGNMENT_RE.sub(r"\1 =", line.rstrip())
+        line = _LONG_STRING_RE.sub(lambda m: f'"{m.group(1)[:100]}...[{len(m.group(1)) - 100} chars]"', line)
+        repeats = sum(1 for _ in group)
+        lines.append(f"{line} (x{repeats})" if repeats > 1 else line)
+    return "\n".join(lines)
 
+def configure_session_proxy(endpoint: str):
+    """Pin the HTTPS proxy on the shared session unless NO_PROXY excludes the endpoint"""
+    https_proxy = os.getenv('HTTPS_PROXY') or os.getenv('https_proxy')
+    no_proxy = os.getenv('NO_PROXY') or os.getenv('no_proxy')
+    if https_proxy and not requests.utils.should_bypass_proxies(endpoint, no_proxy):
+        _SESSION.proxies = {'https': https_proxy}
+
+def warm_up_connection(endpoint: str):
+    """Open a pooled TLS connection to the Azure OpenAI endpoint ahead of the analysis request"""
+    try:
+        _SESSION.head(endpoint, timeout=5)
+    except requests.exceptions.RequestException:
+        # Best effort only - the analysis request opens its own connection if needed
+        pass
+
+def split_plan_into_chunks(plan_text: str) -> List[str]:
+    """Split the plan on resource boundaries into chunks that each fit in a single prompt"""
+    chunks = []
+    current = ""
+    for block in _RESOURCE_BOUNDARY_RE.split(plan_text):
+        if current and len(current) + len(block) > _CHUNK_SIZE:
+            chunks.append(current)
+            current = ""
+        current += block
+        # A single resource larger than a chunk is cut at the chunk size
+        while len(current) > _CHUNK_SIZE:
+            chunks.append(current[:_CHUNK_SIZE])
+            current = current[_CHUNK_SIZE:]
+    if current:
+        chunks.append(current)
+    return chunks
+
+def stream_chat_completion(url: str, api_key: str, messages: List[Dict[str, str]], max_tokens: int, echo: bool = False, max_chars: Optional[int] = None) -> str:
+    """Run a streamed chat completion and return its text (up to max_chars), optionally echoing it to the pipeline log"""
+    
     # Azure OpenAI uses api-key header instead of Authorization Bearer
     headers = {
         'api-key': api_key,
@@ -77,33 +213,159 @@ Provide your analysis following the structure requested in the system prompt."""
     }
     
     payload = {
-        'messages': [
-            {'role': 'system', 'content': system_prompt},
-            {'role': 'user', 'content': user_prompt}
-        ],
-        'max_tokens': 1500,
-        'temperature': 0.1
+        'messages': messages,
+        'max_tokens': max_tokens,
+        'stop': _STOP_SEQUENCES,
+        'temperature': 0.1,
+        'stream': True
     }
     
+    with _SESSION.post(
+        url,
+        headers=headers,
+        data=_json_dumps(payload),
+        stream=True,
+        timeout=60
+    ) as response:
+        if not response.ok:
+            # Load the error body before the stream is closed so the caller can log it
+            response.content
+        response.raise_for_status()
+        
+        # Print content deltas as they arrive instead of waiting for the full completion,
+        # buffering only as much text as the caller can use
+        buffer = []
+        remaining = max_chars if max_chars is not None else sys.maxsize
+        # Unfinished log line, scanned for critical keywords once its newline arrives
+        pending = ""
+        warned = False
+        if echo:
+            sys.stdout.write(_HEADER)
+        for line in response.iter_lines():
+            # Read through [DONE] to the end of the body so the connection goes back to the pool
+            if not line.startswith(b"data: ") or line == b"data: [DONE]":
+                continue
+            chunk = _json_loads(line[6:])
+            if not chunk.get('choices'):
+                # Azure sends prompt filter results in a chunk without choices
+                continue
+            delta = chunk['choices'][0].get('delta', {}).get('content') or ''
+            if echo:
+                output = delta
+                if not warned and "\n" in delta:
+                    complete, _, rest = delta.rpartition("\n")
+                    if _CRITICAL_RE.search(pending + complete):
+                        # Flag critical issues right after the line mentioning them, not at the end
+                        output = f"{complete}\n{_CRITICAL_WARNING}\n{rest}"
+                        warned = True
+                    pending = rest
+                elif not warned:
+                    pending += delta
+                sys.stdout.write(output)
+                sys.stdout.flush()
+            if remaining > 0:
+                buffer.append(delta[:remaining])
+                remaining -= len(delta)
+        if echo:
+            if not warned and _CRITICAL_RE.search(pending):
+                sys.stdout.write(f"\n{_CRITICAL_WARNING}")
+            sys.stdout.write(_FOOTER)
+            sys.stdout.flush()
+        return "".join(buffer)
+
+def analyze_plan_with_azure_openai(plan_text: str, api_key: str, endpoint: str, deployment_name: str, api_version: str = "2025-01-01-preview") -> Dict[str, Any]:
+    """Send Terraform plan to Azure OpenAI for analysis, streaming the response to the pipeline log"""
+    
     # Construct Azure OpenAI endpoint URL
-    url = f"https://tf-open-ai.openai.azure.com/openai/deployments/gpt-4/chat/completions?api-version=2025-01-01-preview"
+    url = f"{endpoint}/openai/deployments/{deployment_name}/chat/completions?api-version={api_version}"
     
     try:
-        response = requests.post(
-            url,
-            headers=headers,
-            json=payload,
-            timeout=60
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        chunks = split_plan_into_chunks(plan_text)
+        if len(chunks) > 1:
+            # Large plans: review the parts concurrently, then merge the findings in a final request
+            print(f"Plan split into {len(chunks)} parts for analysis")
+            with ThreadPoolExecutor(max_workers=_MAX_CONCURRENT_REQUESTS) as executor:
+                findings = list(executor.map(
+                    lambda chunk: stream_chat_completion(url, api_key, [
+                        {'role': 'system', 'content': _CHUNK_SYSTEM_PROMPT},
+                        {'role': 'user', 'content': f"{_USER_PROMPT_PREAMBLE}```\n{chunk}\n```"}
+                    ], _CHUNK_MAX_TOKENS),
+                    chunks
+                ))
+            user_prompt = _REDUCE_PROMPT_PREAMBLE + "\n\n".join(
+                f"Part {index}:\n{part}" for index, part in enumerate(findings, 1)
+            )
+        else:
+            # Static prompt prefix first, plan last, so Azure OpenAI can reuse its prompt cache
+            user_prompt = f"{_USER_PROMPT_PREAMBLE}```\n{plan_text}\n```"
+        
+        analysis_text = stream_chat_completion(url, api_key, [
+            {'role': 'system', 'content': _SYSTEM_PROMPT},
+            {'role': 'user', 'content': user_prompt}
+        ], _ANALYSIS_MAX_TOKENS, echo=True, max_chars=_MAX_ARTIFACT_LENGTH)
+        
+        # Same shape as the non-streaming response so callers are unaffected
+        return {'choices': [{'message': {'role': 'assistant', 'content': analysis_text}}]}
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error calling Azure OpenAI API: {e}")
         if hasattr(e, 'response') and e.response is not None:
             print(f"Response status: {e.response.status_code}")
             print(f"Response text: {e.response.text}")
         return {}
 
+def get_plan_hash(plan_text: str) -> str:
+    """Hash the plan together with the prompts so cached analyses expire when the prompts change"""
+    prompts = f"{_SYSTEM_PROMPT}{_USER_PROMPT_PREAMBLE}{_CHUNK_SYSTEM_PROMPT}{_REDUCE_PROMPT_PREAMBLE}"
+    return hashlib.sha256(f"{prompts}{plan_text}".encode('utf-8')).hexdigest()
+
+def load_cached_analysis(plan_hash: str) -> str:
+    """Return a previously generated analysis for this plan hash, or an empty string"""
+    try:
+        with open(os.path.join(_CACHE_DIR, f"{plan_hash}.txt"), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return ""
+
+def save_cached_analysis(plan_hash: str, analysis_text: str):
+    """Store the analysis so identical plans can skip the Azure OpenAI call"""
+    if not analysis_text:
+        return
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        with open(os.path.join(_CACHE_DIR, f"{plan_hash}.txt"), 'w', encoding='utf-8') as f:
+            f.write(analysis_text)
+    except OSError as e:
+        print(f"Error caching analysis: {e}")
+
+def reuse_prior_analysis(plan_hash: str, filename: str = "terraform-analysis.txt") -> str:
+    """Copy the previous run's analysis artifact forward if it was generated for the same plan and return its text"""
+    prior_path = os.getenv('PRIOR_ANALYSIS_PATH')
+    if not prior_path:
+        return ""
+    try:
+        with open(f"{prior_path}.sha256", 'r', encoding='utf-8') as f:
+            if f.read().strip() != plan_hash:
+                return ""
+        if os.path.abspath(prior_path) != os.path.abspath(filename):
+            shutil.copyfile(prior_path, filename)
+            shutil.copyfile(f"{prior_path}.sha256", f"{filename}.sha256")
+        with open(filename, 'r', encoding='utf-8') as f:
+            # Drop the title and timestamp written by save_analysis_to_file
+            analysis_text = f.read().split("\n\n", 2)[-1]
+    except OSError as e:
+        print(f"Error reusing prior analysis: {e}")
+        return ""
+    print(f"Plan unchanged since the prior analysis, reusing {prior_path}")
+    return analysis_text
+
+def show_stored_analysis(analysis_text: str):
+    """Print an analysis that was not streamed and flag critical issues in it"""
+    print(format_analysis_output({'choices': [{'message': {'role': 'assistant', 'content': analysis_text}}]}))
+    
+    # Check for critical security issues in the analysis (streamed analyses are checked as they arrive)
+    if _CRITICAL_RE.search(analysis_text):
+        print(_CRITICAL_WARNING)
+
 def format_analysis_output(analysis_response: Dict[str, Any]) -> str:
     """Format the Azure OpenAI analysis response for pipeline output"""
     
@@ -113,36 +375,32 @@ def format_analysis_output(analysis_response: Dict[str, Any]) -> str:
     analysis_text = analysis_response['choices'][0]['message']['content']
     
     # Format for Azure DevOps pipeline display
-    formatted_output = f"""
-##[section]🤖 AI-Powered Terraform Plan Analysis
-
-{analysis_text}
+    return f"{_HEADER}{analysis_text}{_FOOTER}"
 
----
-💡 Analysis completed using Azure OpenAI Service
-⚠️  Please review recommendations carefully before deployment
-"""
-    
-    return formatted_output
-
-def save_analysis_to_file(analysis: str, filename: str = "terraform-analysis.txt"):
-    """Save analysis to file for artifact publishing"""
+def save_analysis_to_file(analysis_text: str, plan_hash: str, filename: str = "terraform-analysis.txt"):
+    """Save the plain analysis text (without pipeline formatting) and its plan hash to file for artifact publishing"""
     try:
-        # Extract plain text content from analysis (remove Azure DevOps formatting)
-        plain_text = analysis.replace("##[section]🤖 AI-Powered Terraform Plan Analysis\n\n", "")
-        plain_text = plain_text.replace("\n\n---\n💡 Analysis completed using Azure OpenAI Service\n⚠️  Please review recommendations carefully before deployment\n", "")
+        # Limit content to the artifact character limit in total
+        timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        header = f"Terraform Plan Analysis\n\nGenerated: {timestamp}\n\n"
+        max_content_length = _MAX_ARTIFACT_LENGTH - len(header)
         
-        # Limit content to 4000 characters total
-        header = f"Terraform Plan Analysis\n\nGenerated: {subprocess.run(['date'], capture_output=True, text=True).stdout.strip()}\n\n"
-        max_content_length = 4000 - len(header)
+        if len(analysis_text) > max_content_length:
+            analysis_text = analysis_text[:max_content_length-50] + f"\n\n[Content truncated to fit {_MAX_ARTIFACT_LENGTH} character limit]"
         
-        if len(plain_text) > max_content_length:
-            plain_text = plain_text[:max_content_length-50] + "\n\n[Content truncated to fit 4000 character limit]"
+        # Encode once and write the whole file with unbuffered os.write calls
+        data = memoryview(f"{header}{analysis_text}".encode('utf-8'))
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(header)
-            f.write(plain_text)
-        print(f"Analysis saved to {filename} (max 4000 characters)")
+        # Sidecar hash lets the next run detect an unchanged plan (see reuse_prior_analysis)
+        with open(f"{filename}.sha256", 'w', encoding='utf-8') as f:
+            f.write(plan_hash)
+        print(f"Analysis saved to {filename} (max {_MAX_ARTIFACT_LENGTH} characters)")
     except Exception as e:
         print(f"Error saving analysis to file: {e}")
 
@@ -152,8 +410,9 @@ def main():
     # Get Azure OpenAI configuration from environment
     api_key = os.getenv('AZURE_OPENAI_API_KEY')
     endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
-    deployment_name = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-4')
-    api_version = os.getenv('AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
+    # Workflows export undefined secrets as empty strings, so fall back on those too
+    deployment_name = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME') or 'gpt-4'
+    api_version = os.getenv('AZURE_OPENAI_API_VERSION') or '2025-01-01-preview'
     
     # Validate required environment variables
     if not api_key:
@@ -172,41 +431,59 @@ def main():
     if endpoint.endswith('/'):
         endpoint = endpoint.rstrip('/')
     
+    configure_session_proxy(endpoint)
+    
     print("##[section]🔍 Analyzing Terraform Plan with Azure OpenAI...")
     print(f"Using endpoint: {endpoint}")
     print(f"Using deployment: {deployment_name}")
     
-    # Get the Terraform plan text
-    plan_text = get_terraform_plan_text()
+    # Get the Terraform plan text while the connection to Azure OpenAI is warmed up
+    executor = ThreadPoolExecutor(max_workers=2)
+    plan_future = executor.submit(get_terraform_plan_text)
+    executor.submit(warm_up_connection, endpoint)
+    plan_text = plan_future.result()
+    executor.shutdown(wait=False)
     if not plan_text:
         print("##[error]Failed to generate Terraform plan text")
         return 1
     
-    # Truncate plan if too long (Azure OpenAI has token limits)
-    if len(plan_text) > 10000:
-        plan_text = plan_text[:10000] + "\n... (truncated for analysis)"
-        print("##[warning]Plan output truncated for AI analysis")
-    
-    # Analyze with Azure OpenAI
-    analysis_response = analyze_plan_with_azure_openai(plan_text, api_key, endpoint, deployment_name, api_version)
-    
-    if not analysis_response:
-        print("##[error]Failed to get analysis from Azure OpenAI")
-        return 1
-    
-    # Format and display analysis
-    formatted_analysis = format_analysis_output(analysis_response)
-    print(formatted_analysis)
-    
-    # Save analysis to file for artifact
-    save_analysis_to_file(formatted_analysis)
+    # Carry the previous run's artifact forward when the plan has not changed
+    plan_hash = get_plan_hash(plan_text)
+    prior_analysis = reuse_prior_analysis(plan_hash)
+    if prior_analysis:
+        show_stored_analysis(prior_analysis)
+        print("##[section]✅ AI Analysis Complete")
+        return 0
     
-    # Check for critical security issues in the analysis
-    analysis_text = analysis_response.get('choices', [{}])[0].get('message', {}).get('content', '').lower()
+    # Reuse the analysis of an identical plan from a previous run
+    cached_analysis = load_cached_analysis(plan_hash)
+    if cached_analysis:
+        print(f"Plan unchanged since a previous run, using cached analysis ({plan_hash[:12]})")
+        analysis_response = {'choices': [{'message': {'role': 'assistant', 'content': cached_analysis}}]}
+        show_stored_analysis(cached_analysis)
+    else:
+        # Drop plan noise first so fewer and smaller requests are needed
+        original_length = len(plan_text)
+        plan_text = compress_plan_text(plan_text)
+        print(f"Plan text compressed from {original_length} to {len(plan_text)} characters")
+        
+        # Truncate plan if too long (large plans are analyzed in parts, up to a limit)
+        if len(plan_text) > _MAX_PLAN_LENGTH:
+            plan_text = plan_text[:_MAX_PLAN_LENGTH] + "\n... (truncated for analysis)"
+            print("##[warning]Plan output truncated for AI analysis")
+        
+        # Analyze with Azure OpenAI (the analysis is streamed to the log as it arrives)
+        analysis_response = analyze_plan_with_azure_openai(plan_text, api_key, endpoint, deployment_name, api_version)
+        
+        if not analysis_response:
+            print("##[error]Failed to get analysis from Azure OpenAI")
+            return 1
+        
+        save_cached_analysis(plan_hash, analysis_response['choices'][0]['message']['content'])
     
-    critical_keywords = ['critical', 'severe', 'high risk', 'security vulnerability', 'exposed']
-    if any(keyword in analysis_text for keyword in critical_keywords):
-        print("##[warning]⚠️ Critical issues detected in analysis. Please review carefully!")
+    # Save the raw analysis to file for artifact (pipeline formatting is only added to the log)
+    analysis_text = analysis_response['choices'][0]['message']['content']
+    save_analysis_to_file(analysis_text, plan_hash)
     
     print("##[section]✅ AI Analysis Complete")
     return 0
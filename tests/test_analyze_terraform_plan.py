@@ -0,0 +1,46 @@
+import importlib.util
+import os
+import unittest
+
+_SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'analyze-terraform-plan.py')
+_spec = importlib.util.spec_from_file_location('analyze_terraform_plan', _SCRIPT)
+analyze = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(analyze)
+
+
+class SplitPlanIntoChunksTest(unittest.TestCase):
+    def _split(self, plan_text: str) -> list:
+        return [block for block in analyze._RESOURCE_BOUNDARY_RE.split(plan_text) if block]
+
+    def _block(self, header: str) -> str:
+        return f"  {header}\n" + "      + attribute = \"value\"\n" * 200 + "    }\n\n"
+
+    def test_splits_on_every_resource_header(self):
+        headers = [
+            '# azurerm_resource_group.rg will be created',
+            '# azurerm_storage_account.sa is tainted, so must be replaced',
+            '# module.m.azurerm_subnet.s["a b"] must be replaced',
+            '# azurerm_key_vault.kv has changed',
+            '# data.azurerm_client_config.current will be read during apply',
+        ]
+        plan_text = "".join(self._block(header) for header in headers)
+        blocks = self._split(plan_text)
+        self.assertEqual([block.splitlines()[0].strip() for block in blocks], headers)
+
+    def test_hidden_attribute_markers_are_not_boundaries(self):
+        plan_text = self._block('# azurerm_resource_group.rg will be updated in-place')
+        plan_text = plan_text.replace('    }', '        # (3 unchanged attributes hidden)\n    }')
+        self.assertEqual(len(self._split(plan_text)), 1)
+
+    def test_chunks_respect_size_and_keep_whole_blocks(self):
+        plan_text = "".join(self._block(f'# azurerm_subnet.s{index} will be created') for index in range(10))
+        chunks = analyze.split_plan_into_chunks(plan_text)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), plan_text)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk), analyze._CHUNK_SIZE)
+            self.assertTrue(chunk.startswith('  # azurerm_subnet.s'))
+
+
+if __name__ == '__main__':
+    unittest.main()